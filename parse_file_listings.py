@@ -2,9 +2,11 @@
 import argparse
 import codecs
 import logging
+import mmap
 import os
 import sys
 import time
+from functools import lru_cache, partial
 
 # Try importing tqdm for progress indication (optional)
 try:
@@ -18,10 +20,14 @@ def parse_unicode_string(string: str) -> str:
     Parse a string that might contain Unicode escape sequences.
     Handles both regular characters and Unicode escape sequences.
     """
+    # Plain strings (no backslash) cannot contain an escape sequence; skip
+    # the decode round-trip for the common case.
+    if '\\' not in string:
+        return string
     try:
         # Handle \u escape sequences (e.g., '\\u00A0')
         return codecs.decode(string, 'unicode_escape')
-    except Exception as exception:
+    except UnicodeError as exception:
         logging.error(f"Error while decoding Unicode sequences: {exception}")
         return string
 
@@ -31,99 +37,271 @@ def find_file_or_directory_name_start_position(line: str, ignore_characters: str
     Returns the index where the actual file/directory name starts in a given line,
     ignoring any leading characters that are in 'ignore_characters'.
     """
-    count = 0
-    for char in line:
-        if char in ignore_characters:
-            count += 1
-        else:
-            return count
-    return count
+    return len(line) - len(line.lstrip(ignore_characters))
 
 
-def process_file_listing(args):
-    # --- Input File Validation and Error Handling ---
-    if not os.path.isfile(args.input_file):
-        logging.error(f"Input file '{args.input_file}' does not exist or is not a file.")
-        sys.exit(1)
+def parse_listing_lines(lines, ignore_chars, indent_level, path_prefix, path_separator,
+                        blocklist=(), block_table=None, encoding=None):
+    """
+    Core parsing loop: walk an iterable of listing lines and yield the full
+    output path for each non-empty line. All run-wide configuration comes in
+    as plain parameters so the per-line work runs entirely over locals.
 
-    try:
-        with open(args.input_file, "r", encoding=args.encoding) as f:
-            file_listing_lines = f.readlines()
-    except Exception as e:
-        logging.error(f"Failed to read input file '{args.input_file}': {e}")
-        sys.exit(1)
+    When 'encoding' is given, 'lines' and 'ignore_chars' are bytes and only
+    the extracted names are decoded; the indent scan runs on the raw bytes.
 
-    # --- Enhanced Unicode Support ---
-    # Use the base ignore list plus any characters in the blocklist for indentation purposes.
-    base_ignore = parse_unicode_string(args.character_ignore_list)
-    if hasattr(args, "blocklist") and args.blocklist:
-        ignore_chars = base_ignore + ''.join(args.blocklist)
+    Dispatches to one of two specialized loops so the common (non-debug)
+    case carries no logging code at all.
+    """
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        loop = _parse_listing_lines_debug
     else:
-        ignore_chars = base_ignore
+        loop = _parse_listing_lines_fast
+    return loop(lines, ignore_chars, indent_level, path_prefix, path_separator,
+                blocklist, block_table, encoding)
+
+
+def _parse_listing_lines_fast(lines, ignore_chars, indent_level, path_prefix,
+                              path_separator, blocklist, block_table, encoding):
+    # Real listings repeat whole lines (same indent, same name) constantly;
+    # memoizing the split lets repeats skip the strip/decode/blocklist work.
+    @lru_cache(maxsize=4096)
+    def split_line(line):
+        stripped_line = line.lstrip(ignore_chars)
+        position = len(line) - len(stripped_line)
+        name = stripped_line.strip()
+        if encoding is not None:
+            name = name.decode(encoding)
 
-    # Determine the correct path separator
-    path_separator = "/" if args.unix_separators else "\\"
+        # Remove blocked characters from the extracted name.
+        if block_table is not None:
+            name = name.translate(block_table)
+        else:
+            for ch in blocklist:
+                name = name.replace(ch, "")
 
-    path_stack = [args.path_prefix]
-    output_lines = []
+        # Names like 'src' or 'node_modules' recur constantly in real
+        # listings; interning collapses the duplicates to one object.
+        return position, sys.intern(name)
 
-    # --- Progress Indicator ---
-    disable_progress_bar = args.debug or (args.output_file is None)
-    if tqdm is not None:
-        iterator = tqdm(file_listing_lines, desc="Processing lines", disable=disable_progress_bar)
-    else:
-        iterator = file_listing_lines
+    # Each entry is the full joined path up to that directory level, so
+    # emitting a line is a single list index instead of an O(depth) join.
+    prefix_stack = [path_prefix]
+    prefix_append = prefix_stack.append
 
-    for line in iterator:
-        # Skip empty lines
-        if line.strip() == "":
+    for line in lines:
+        # Skip empty lines (isspace avoids allocating a stripped copy)
+        if not line or line.isspace():
             continue
 
-        starting_position = find_file_or_directory_name_start_position(line, ignore_chars)
-        file_or_directory_name = line[starting_position:].strip()
-        
-        # Remove blocked characters from the extracted name.
-        if hasattr(args, 'blocklist') and args.blocklist:
-            for ch in args.blocklist:
+        starting_position, file_or_directory_name = split_line(line)
+
+        # Adjust the path stack based on the current directory level. The
+        # truncation folds the old pop-until-parent loop and the sibling
+        # replacement pop into one C-level delete; index 0 (the path prefix)
+        # is never dropped.
+        del prefix_stack[max(1, starting_position // indent_level):]
+
+        prefix_append(prefix_stack[-1] + path_separator + file_or_directory_name)
+        yield prefix_stack[-1]
+
+
+def _parse_listing_lines_debug(lines, ignore_chars, indent_level, path_prefix,
+                               path_separator, blocklist, block_table, encoding):
+    log = logging.getLogger()
+    prefix_stack = [path_prefix]
+
+    for line in lines:
+        if not line or line.isspace():
+            continue
+
+        stripped_line = line.lstrip(ignore_chars)
+        starting_position = len(line) - len(stripped_line)
+        file_or_directory_name = stripped_line.strip()
+        if encoding is not None:
+            file_or_directory_name = file_or_directory_name.decode(encoding)
+
+        if block_table is not None:
+            file_or_directory_name = file_or_directory_name.translate(block_table)
+        else:
+            for ch in blocklist:
                 file_or_directory_name = file_or_directory_name.replace(ch, "")
 
-        current_directory_level = int(starting_position / args.indent_level)
+        file_or_directory_name = sys.intern(file_or_directory_name)
+        current_directory_level = starting_position // indent_level
 
         # --- Enhanced Logging and Debugging ---
-        logging.debug(f"Line: {line.strip()}")
-        logging.debug(f"Starting position: {starting_position}")
+        log.debug("Line: %s", line.strip())
+        log.debug("Starting position: %s", starting_position)
         if starting_position < len(line):
-            logging.debug(f"Stop character: {line[starting_position]}")
-        logging.debug(f"Extracted name (after blocking): {file_or_directory_name}")
-        logging.debug(f"Current directory level: {current_directory_level}")
-        logging.debug(f"Current path stack: {path_separator.join(path_stack)}")
+            log.debug("Stop character: %s", line[starting_position:starting_position + 1])
+        log.debug("Extracted name (after blocking): %s", file_or_directory_name)
+        log.debug("Current directory level: %s", current_directory_level)
+        log.debug("Current path stack: %s", prefix_stack[-1])
 
-        # Adjust the path stack based on the current directory level
-        while current_directory_level < len(path_stack) - 1:
-            path_stack.pop()
+        del prefix_stack[max(1, current_directory_level):]
 
-        if current_directory_level == len(path_stack) - 1 and len(path_stack) - 1 != 0:
-            path_stack.pop()
+        prefix_stack.append(prefix_stack[-1] + path_separator + file_or_directory_name)
+        yield prefix_stack[-1]
 
-        path_stack.append(file_or_directory_name)
-        output_lines.append(path_separator.join(path_stack))
 
-        # --- Debug Delay ---
-        if args.debug and getattr(args, "debug_delay", 0) > 0:
-            time.sleep(args.debug_delay)
+def _iterate_with_byte_progress(lines, progress_bar, update_threshold=1 << 16):
+    """
+    Pass byte lines through unchanged while advancing 'progress_bar' by bytes
+    consumed, batching updates so progress bookkeeping stays off the
+    per-line path.
+    """
+    pending = 0
+    try:
+        for line in lines:
+            pending += len(line)
+            if pending >= update_threshold:
+                progress_bar.update(pending)
+                pending = 0
+            yield line
+    finally:
+        if pending:
+            progress_bar.update(pending)
 
-    # --- Dry-run Mode ---
+
+def process_file_listing(args):
+    # --- Input File Validation and Error Handling ---
+    if not os.path.isfile(args.input_file):
+        logging.error(f"Input file '{args.input_file}' does not exist or is not a file.")
+        sys.exit(1)
+
+    # --- Enhanced Unicode Support ---
+    # Use the base ignore list plus any characters in the blocklist for indentation purposes.
+    base_ignore = parse_unicode_string(args.character_ignore_list)
+    blocklist = getattr(args, "blocklist", None) or []
+    # Deduplicate so each lstrip scans the smallest possible separator set.
+    ignore_chars = ''.join(dict.fromkeys(base_ignore + ''.join(blocklist)))
+
+    # Blocked characters are deleted from extracted names. One str.translate
+    # pass beats chained str.replace for larger blocklists, but for one or two
+    # characters the replace chain is still faster.
+    block_table = str.maketrans('', '', ''.join(blocklist)) if len(blocklist) > 2 else None
+
+    # Determine the correct path separator
+    path_separator = "/" if args.unix_separators else "\\"
+
+    # --- Output Destination ---
+    # Paths are written out as they are produced, so memory stays flat no
+    # matter how large the input listing is. Dry-run mode streams to stdout.
     if args.dry_run or not args.output_file:
-        print("\n".join(output_lines))
+        f_out = sys.stdout
     else:
         try:
-            with open(args.output_file, "w", encoding=args.encoding) as f_out:
-                f_out.write("\n".join(output_lines))
-            logging.info(f"Output written to '{args.output_file}'")
+            # A large buffer keeps the per-line writes cheap and batches the
+            # underlying write syscalls; newline='\n' skips per-line newline
+            # translation and keeps output byte-identical across platforms.
+            f_out = open(args.output_file, "w", encoding=args.encoding,
+                         buffering=1 << 20, newline='\n')
         except Exception as e:
-            logging.error(f"Failed to write to output file '{args.output_file}': {e}")
+            logging.error(f"Failed to open output file '{args.output_file}': {e}")
             sys.exit(1)
 
+    # --- ASCII Fast Path ---
+    # With an ASCII-compatible encoding and an all-ASCII ignore set the indent
+    # scan can run on raw bytes (UTF-8 continuation bytes are >= 0x80, so they
+    # can never match an ignore character); only the names get decoded.
+    try:
+        codec_name = codecs.lookup(args.encoding).name
+    except LookupError:
+        codec_name = None
+    binary_mode = (codec_name in ("utf-8", "ascii")
+                   and ignore_chars.isascii()
+                   and all(ch.isascii() for ch in blocklist))
+
+    # --- Debug Delay ---
+    # Decided once per run; the write loop just calls through, and the call
+    # target is a no-op unless a delay was actually requested.
+    if args.debug and getattr(args, "debug_delay", 0) > 0:
+        maybe_sleep = partial(time.sleep, args.debug_delay)
+    else:
+        def maybe_sleep():
+            return None
+
+    try:
+        if binary_mode:
+            f = open(args.input_file, "rb", buffering=1 << 20)
+        else:
+            f = open(args.input_file, "r", encoding=args.encoding, buffering=1 << 20)
+            # TextIOWrapper decodes in 8 KiB chunks regardless of the raw
+            # buffer size; widen it so large listings hit the decoder fewer
+            # times. Private attribute, so degrade gracefully without it.
+            if hasattr(f, "_CHUNK_SIZE"):
+                f._CHUNK_SIZE = 1 << 20
+        with f:
+            # In binary mode, map the file and read lines straight out of the
+            # page cache instead of copying through read() buffers.
+            mm = None
+            progress_bar = None
+            if binary_mode:
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, OSError):
+                    mm = None  # e.g. empty file or mmap-hostile filesystem
+            try:
+                lines = iter(mm.readline, b"") if mm is not None else f
+
+                # --- Progress Indicator ---
+                disable_progress_bar = args.debug or (args.output_file is None)
+                if tqdm is None or disable_progress_bar:
+                    iterator = lines
+                elif binary_mode:
+                    # Byte-based progress: one batched update per ~64 KiB of
+                    # input instead of tqdm bookkeeping on every line.
+                    progress_bar = tqdm(total=os.path.getsize(args.input_file),
+                                        desc="Processing lines", unit="B", unit_scale=True)
+                    iterator = _iterate_with_byte_progress(lines, progress_bar)
+                else:
+                    iterator = tqdm(lines, desc="Processing lines")
+
+                if binary_mode:
+                    paths = parse_listing_lines(iterator, ignore_chars.encode("ascii"),
+                                                args.indent_level, args.path_prefix,
+                                                path_separator, blocklist, block_table,
+                                                encoding=args.encoding)
+                else:
+                    paths = parse_listing_lines(iterator, ignore_chars, args.indent_level,
+                                                args.path_prefix, path_separator,
+                                                blocklist, block_table)
+                if args.debug and getattr(args, "debug_delay", 0) > 0:
+                    # Paced debug runs keep per-line writes so each path is
+                    # visible as it is produced.
+                    for path in paths:
+                        f_out.write(path)
+                        f_out.write("\n")
+                        maybe_sleep()
+                else:
+                    # Hand the writer ~8k paths at a time instead of two
+                    # write calls per line.
+                    out_buffer = []
+                    buffer_append = out_buffer.append
+                    writelines = f_out.writelines
+                    for path in paths:
+                        buffer_append(path + "\n")
+                        if len(out_buffer) >= 8192:
+                            writelines(out_buffer)
+                            out_buffer.clear()
+                    if out_buffer:
+                        writelines(out_buffer)
+            finally:
+                if progress_bar is not None:
+                    progress_bar.close()
+                if mm is not None:
+                    mm.close()
+    except Exception as e:
+        logging.error(f"Failed to process input file '{args.input_file}': {e}")
+        sys.exit(1)
+    finally:
+        if f_out is not sys.stdout:
+            f_out.close()
+
+    if f_out is not sys.stdout:
+        logging.info(f"Output written to '{args.output_file}'")
+
 
 def character_detection_mode(args):
     """
@@ -145,14 +323,33 @@ def character_detection_mode(args):
         logging.error(f"Input file '{args.input_file}' does not exist or is not a file.")
         sys.exit(1)
     try:
-        with open(args.input_file, "r", encoding=args.encoding) as f:
-            file_listing_lines = f.readlines()
+        f = open(args.input_file, "r", encoding=args.encoding)
     except Exception as e:
-        logging.error(f"Failed to read input file '{args.input_file}': {e}")
+        logging.error(f"Failed to open input file '{args.input_file}': {e}")
         sys.exit(1)
 
+    # Lines are read on demand instead of readlines()-ing the whole listing
+    # up front; stepping backward replays from the cache of lines seen so far.
+    seen_lines = []
+
+    def line_at(index):
+        while len(seen_lines) <= index:
+            try:
+                next_line = f.readline()
+            except Exception as e:
+                logging.error(f"Failed to read input file '{args.input_file}': {e}")
+                sys.exit(1)
+            if not next_line:
+                return None
+            seen_lines.append(next_line)
+        return seen_lines[index]
+
     blocklist = []  # Characters the user wants to block
     base_ignore = parse_unicode_string(args.character_ignore_list)
+    # In detection mode the effective ignore list is the union of the base
+    # ignore and the blocklist, so blocked characters are skipped. It is kept
+    # up to date as the blocklist changes rather than rebuilt per keypress.
+    current_ignore = ''.join(dict.fromkeys(base_ignore))
 
     print("\n=== Entering Character Detection Mode ===")
     print("Key Bindings:")
@@ -164,80 +361,86 @@ def character_detection_mode(args):
     print("  [q] Quit detection mode")
     
     i = 0
-    while i < len(file_listing_lines):
-        line = file_listing_lines[i]
-        if line.strip() == "":
-            i += 1
-            continue
-
+    try:
         while True:
-            # In detection mode, use the union of base_ignore and blocklist
-            # so that blocked characters are skipped.
-            current_ignore = base_ignore + ''.join(blocklist)
-            starting_position = find_file_or_directory_name_start_position(line, current_ignore)
-            if starting_position < len(line):
-                current_char = line[starting_position]
-            else:
-                current_char = None
-
-            print(f"\nLine {i+1}: {line.rstrip()}")
-            print(f"Current ignore list: {repr(current_ignore)}")
-            print(f"Blocklist: {blocklist}")
-            print(f"Detected starting position: {starting_position}")
-            if current_char is not None:
-                print(f"Detected stop character: '{current_char}'")
-            else:
-                print("No non-ignored character found on this line.")
-
-            key = input("Press [s] to step forward, [p] to step backward, [b] to block current char, [u] to unblock a char, [r] to run conversion, or [q] to quit: ").strip().lower()
-            if key == 'b':
-                if current_char is None:
-                    print("Nothing to block on this line; stepping forward.")
-                    break
-                if current_char in blocklist:
-                    print(f"Character '{current_char}' is already blocked.")
+            line = line_at(i)
+            if line is None:
+                break
+            if not line or line.isspace():
+                i += 1
+                continue
+
+            while True:
+                starting_position = find_file_or_directory_name_start_position(line, current_ignore)
+                if starting_position < len(line):
+                    current_char = line[starting_position]
                 else:
-                    blocklist.append(current_char)
-                    print(f"Added '{current_char}' to blocklist.")
-                    # Recalculate starting position for this line with the updated blocklist.
-                    continue
-            elif key == 'u':
-                if not blocklist:
-                    print("Blocklist is empty. Nothing to unblock.")
+                    current_char = None
+
+                print(f"\nLine {i+1}: {line.rstrip()}")
+                print(f"Current ignore list: {repr(current_ignore)}")
+                print(f"Blocklist: {blocklist}")
+                print(f"Detected starting position: {starting_position}")
+                if current_char is not None:
+                    print(f"Detected stop character: '{current_char}'")
                 else:
-                    print("Current blocklist:", blocklist)
-                    to_unblock = input("Enter the character you want to unblock (you can use Unicode escapes, e.g., '\\u00A0'): ").strip()
-                    to_unblock = parse_unicode_string(to_unblock)
-                    if to_unblock in blocklist:
-                        blocklist.remove(to_unblock)
-                        print(f"Removed '{to_unblock}' from blocklist.")
+                    print("No non-ignored character found on this line.")
+
+                key = input("Press [s] to step forward, [p] to step backward, [b] to block current char, [u] to unblock a char, [r] to run conversion, or [q] to quit: ").strip().lower()
+                if key == 'b':
+                    if current_char is None:
+                        print("Nothing to block on this line; stepping forward.")
+                        break
+                    if current_char in blocklist:
+                        print(f"Character '{current_char}' is already blocked.")
                     else:
-                        print(f"Character '{to_unblock}' is not in the blocklist.")
-                    continue  # Reprocess the same line with the updated blocklist.
-            elif key == 'r':
-                # Save the blocklist in args (do not change the base ignore list).
-                args.blocklist = blocklist
-                print("\nRunning file listing conversion with the current blocklist...")
-                process_file_listing(args)
-                return
-            elif key == 's':
-                i += 1
-                break  # Move to the next line.
-            elif key == 'p':
-                if i > 0:
-                    i -= 1
-                    break  # Step back one line.
+                        blocklist.append(current_char)
+                        # The stop character is by definition not yet ignored, so
+                        # appending keeps current_ignore duplicate-free.
+                        current_ignore += current_char
+                        print(f"Added '{current_char}' to blocklist.")
+                        # Recalculate starting position for this line with the updated blocklist.
+                        continue
+                elif key == 'u':
+                    if not blocklist:
+                        print("Blocklist is empty. Nothing to unblock.")
+                    else:
+                        print("Current blocklist:", blocklist)
+                        to_unblock = input("Enter the character you want to unblock (you can use Unicode escapes, e.g., '\\u00A0'): ").strip()
+                        to_unblock = parse_unicode_string(to_unblock)
+                        if to_unblock in blocklist:
+                            blocklist.remove(to_unblock)
+                            current_ignore = ''.join(dict.fromkeys(base_ignore + ''.join(blocklist)))
+                            print(f"Removed '{to_unblock}' from blocklist.")
+                        else:
+                            print(f"Character '{to_unblock}' is not in the blocklist.")
+                        continue  # Reprocess the same line with the updated blocklist.
+                elif key == 'r':
+                    # Save the blocklist in args (do not change the base ignore list).
+                    args.blocklist = blocklist
+                    print("\nRunning file listing conversion with the current blocklist...")
+                    process_file_listing(args)
+                    return
+                elif key == 's':
+                    i += 1
+                    break  # Move to the next line.
+                elif key == 'p':
+                    if i > 0:
+                        i -= 1
+                        break  # Step back one line.
+                    else:
+                        print("Already at the first line; cannot step backwards.")
+                        continue
+                elif key == 'q':
+                    print("Quitting character detection mode.")
+                    print("Final blocklist:", blocklist)
+                    return
                 else:
-                    print("Already at the first line; cannot step backwards.")
-                    continue
-            elif key == 'q':
-                print("Quitting character detection mode.")
-                print("Final blocklist:", blocklist)
-                return
-            else:
-                print("Invalid input. Please try again.")
-    print("\n=== Character Detection Mode Complete ===")
-    print("Final blocklist:", blocklist)
+                    print("Invalid input. Please try again.")
+        print("\n=== Character Detection Mode Complete ===")
+        print("Final blocklist:", blocklist)
+    finally:
+        f.close()
 
 
 def interactive_mode():
@@ -319,6 +522,21 @@ def run_tests():
             line3 = "filename"
             self.assertEqual(find_file_or_directory_name_start_position(line3, ignore_chars), 0)
 
+        def test_parse_listing_lines(self):
+            lines = ["root\n", "\n", "    dir1\n", "        file1.txt\n", "    dir2\n"]
+            result = list(parse_listing_lines(lines, " ", 4, "C:", "\\"))
+            self.assertEqual(result, ["C:\\root", "C:\\dir1", "C:\\dir1\\file1.txt", "C:\\dir2"])
+
+        def test_parse_listing_lines_blocklist(self):
+            lines = ["--a\n", "----b\n"]
+            result = list(parse_listing_lines(lines, " -", 2, "C:", "\\", blocklist=["-"]))
+            self.assertEqual(result, ["C:\\a", "C:\\a\\b"])
+
+        def test_parse_listing_lines_bytes(self):
+            lines = [b"root\n", b"    caf\xc3\xa9\n"]
+            result = list(parse_listing_lines(lines, b" ", 4, "C:", "\\", encoding="utf-8"))
+            self.assertEqual(result, ["C:\\root", "C:\\caf\u00e9"])
+
     suite = unittest.TestLoader().loadTestsFromTestCase(TestFileListingConverter)
     unittest.TextTestRunner(verbosity=2).run(suite)
 